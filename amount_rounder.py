@@ -1,16 +1,27 @@
 from __future__ import annotations
+import io
 import math
 import os
 import re
 import json
-from datetime import datetime
-from typing import Optional, Set, Dict, List, Tuple
+import shutil
+from concurrent.futures import ProcessPoolExecutor
+from datetime import date, datetime, time, timedelta
+from functools import lru_cache, partial
+from typing import BinaryIO, Optional, Set, Dict, List, Tuple, Union
 
+import numpy as np
 import pandas as pd
-from openpyxl import load_workbook
-from openpyxl.cell.cell import MergedCell
+from openpyxl import Workbook, load_workbook
+from openpyxl.cell.cell import WriteOnlyCell
+from openpyxl.cell.read_only import EmptyCell, ReadOnlyCell
 from openpyxl.worksheet.worksheet import Worksheet
 
+try:  # optional: JIT-compiled kernel for _divide_amounts
+    import numba
+except ImportError:
+    numba = None
+
 # ---------------- Utils -----------------
 DAYS_HEADER_VARIANTS: Set[str] = {
     "no of days", "no. of days", "number of days", "days", "no days", "no of day"
@@ -27,16 +38,22 @@ MONTH_TOKENS = {
     "jul","july","aug","august","sep","sept","september","oct","october","nov","november","dec","december"
 }
 
+# Number-format fragments that mark a date/year cell
+YEARISH_FORMAT_TOKENS = ("yy", "yyyy", "mmm", "mm/", "dd", "-yy", "d-m", "m-d")
+
 ROW_YEARISH_TOKENS = {
     "as at","as on","year ended","fy","financial year","fiscal year","assessment year","ay","quarter","qtr",
     "balance sheet","profit and loss","statement of"
 }
 
-YEAR_REGEXES = [
-    re.compile(r"\b(19|20)\d{2}\b"),               # 2024
-    re.compile(r"\b(19|20)\d{2}\s*[-/]\s*\d{2}\b") # 2024-25, 2024/25
-]
+# 2024, 2024-25, 2024/25
+YEAR_RX = re.compile(r"\b(?:19|20)\d{2}(?:\s*[-/]\s*\d{2})?\b")
+# Any of ROW_YEARISH_TOKENS, in one search
+ROW_YEARISH_RX = re.compile("|".join(map(re.escape, sorted(ROW_YEARISH_TOKENS, key=len, reverse=True))))
+# Shorter text cannot hold a year-ish token ("fy", "ay") or a year
+_MIN_YEARISH_LEN = min(len(tok) for tok in ROW_YEARISH_TOKENS)
 
+@lru_cache(maxsize=8192, typed=True)
 def normalize_header(s: Optional[str]) -> str:
     if s is None:
         return ""
@@ -48,15 +65,33 @@ def round_half_up_int(x: float) -> int:
     return int(sign * math.floor(a + 0.5))
 
 def is_percentage_cell(cell) -> bool:
-    fmt = (cell.number_format or "").lower()
-    return "%" in fmt
-
-def header_map(ws: Worksheet, header_row: int) -> Dict[int, str]:
-    hdrs = {}
-    max_col = ws.max_column or 0
-    for c in range(1, max_col + 1):
-        hdrs[c] = normalize_header(ws.cell(row=header_row, column=c).value)
-    return hdrs
+    # "%" has no case, so no need to lower() the format
+    return "%" in (cell.number_format or "")
+
+def header_map(ws: Worksheet, header_row: int, max_col: Optional[int] = None) -> Dict[int, str]:
+    # One pass over the header row's values (no Cell objects); columns with
+    # no header are left out. Pass max_col on regular sheets, whose
+    # iter_rows() otherwise creates cells out to ws.max_column
+    try:
+        row = next(ws.iter_rows(min_row=header_row, max_row=header_row, max_col=max_col, values_only=True))
+    except StopIteration:
+        return {}
+    return {c: normalize_header(v) for c, v in enumerate(row, 1) if v is not None}
+
+def _used_bounds(ws: Worksheet) -> Tuple[int, int]:
+    """
+    (last row, last column) holding a value. Styled but empty cells push
+    ws.max_row/max_column out, and iter_rows() would create every cell in
+    that range.
+    """
+    max_r = max_c = 0
+    for (r, c), cell in ws._cells.items():
+        if cell.value is not None:
+            if r > max_r:
+                max_r = r
+            if c > max_c:
+                max_c = c
+    return max_r, max_c
 
 # ------------- Core Conversion (division) -------------
 
@@ -64,64 +99,149 @@ def _should_fallback_to_thousand(val: float, lakh_edge_threshold: float) -> bool
     # If lakhs would be too small/unhelpful, prefer thousands
     return abs(val) < lakh_edge_threshold
 
+def _round2_div(val: float, divisor: float) -> float:
+    """
+    val / divisor rounded to 2 decimals, half away from zero.
+    Scaling by 100 before dividing keeps whole-rupee ties exact (297015 -> 297.02).
+    """
+    q = val * 100.0 / divisor
+    if q >= 0:
+        return math.floor(q + 0.5) / 100.0
+    return -math.floor(0.5 - q) / 100.0
+
 def _divide_amount(val: float, mode: str, lakh_edge_threshold: float) -> float:
     """
     Convert by dividing into thousand/lakh with 2 decimal places.
     """
     if mode == "thousand":
-        return round(val / 1000.0, 2)
+        divisor = 1000.0
     elif mode == "lakh":
-        if _should_fallback_to_thousand(val, lakh_edge_threshold):
-            return round(val / 1000.0, 2)
-        return round(val / 100000.0, 2)
+        divisor = 1000.0 if _should_fallback_to_thousand(val, lakh_edge_threshold) else 100000.0
     elif mode == "auto":
         # If 1 lakh or more -> lakhs; else if moderately large -> thousands; else leave as is
-        if abs(val) >= 100000:
-            return round(val / 100000.0, 2)
-        elif abs(val) >= lakh_edge_threshold:
-            return round(val / 1000.0, 2)
+        a = abs(val)
+        if a >= 100000:
+            divisor = 100000.0
+        elif a >= lakh_edge_threshold:
+            divisor = 1000.0
         else:
             return val
     else:
         return val
+    return _round2_div(val, divisor)
+
+def _round2_div_arr(vals: np.ndarray, divisor) -> np.ndarray:
+    """
+    Array version of _round2_div; divisor may be a scalar or an array.
+    """
+    q = vals * 100.0 / divisor
+    # + 0.0 turns the -0.0 of tiny negatives into 0.0, as in the scalar path
+    return np.copysign(np.floor(np.abs(q) + 0.5), q) / 100.0 + 0.0
+
+_MODE_IDS = {"thousand": 0, "lakh": 1, "auto": 2}
+
+if numba is not None:
+    # Serial on purpose: numba's parallel thread pool is not fork-safe, and
+    # process_excel(workers > 1) forks after the main process may have used it
+    @numba.njit(cache=True)
+    def _divide_arr(vals, mode_id, lakh_edge_threshold):
+        # Same rules as _divide_amount / _round2_div, one compiled loop
+        out = np.empty_like(vals)
+        for i in range(vals.size):
+            v = vals[i]
+            a = v if v >= 0 else -v
+            divisor = 0.0
+            if mode_id == 0:
+                divisor = 1000.0
+            elif mode_id == 1:
+                divisor = 1000.0 if a < lakh_edge_threshold else 100000.0
+            elif a >= 100000:
+                divisor = 100000.0
+            elif a >= lakh_edge_threshold:
+                divisor = 1000.0
+            if divisor == 0.0:
+                out[i] = v
+            else:
+                q = v * 100.0 / divisor
+                if q >= 0:
+                    out[i] = np.floor(q + 0.5) / 100.0
+                else:
+                    out[i] = -np.floor(0.5 - q) / 100.0 + 0.0
+        return out
+
+def _divide_amounts(vals: np.ndarray, mode: str, lakh_edge_threshold: float) -> np.ndarray:
+    """
+    Vectorized _divide_amount over a float array (same rules, one NumPy pass).
+    Uses the numba kernel when numba is installed.
+    """
+    if numba is not None and mode in _MODE_IDS:
+        return _divide_arr(vals, _MODE_IDS[mode], float(lakh_edge_threshold))
+    # Pick a divisor per element and round once, rather than rounding every
+    # value both ways and selecting; "thousand" needs no selection at all
+    if mode == "thousand":
+        return _round2_div_arr(vals, 1000.0)
+    absv = np.abs(vals)
+    if mode == "lakh":
+        return _round2_div_arr(vals, np.where(absv < lakh_edge_threshold, 1000.0, 100000.0))
+    elif mode == "auto":
+        converted = _round2_div_arr(vals, np.where(absv >= 100000, 100000.0, 1000.0))
+        return np.where((absv >= 100000) | (absv >= lakh_edge_threshold), converted, vals)
+    else:
+        return vals.copy()
 
 # ---------- Year/date detection ----------
 
 def _cell_has_yearish_text(val: str) -> bool:
     s = normalize_header(val)
-    if not s:
+    if len(s) < _MIN_YEARISH_LEN:
         return False
-    if any(rx.search(s) for rx in YEAR_REGEXES):
-        return True
-    if any(tok in s for tok in ROW_YEARISH_TOKENS):
-        return True
-    # month + year in same string
-    if any(m in s for m in MONTH_TOKENS) and any(rx.search(s) for rx in YEAR_REGEXES):
-        return True
-    return False
+    # A month name only counts together with a year, so the year check covers it
+    return YEAR_RX.search(s) is not None or ROW_YEARISH_RX.search(s) is not None
 
 def _is_four_digit_year_num(v) -> bool:
-    if isinstance(v, (int, float)) and not isinstance(v, bool) and float(v).is_integer():
-        iv = int(v)
-        return 1900 <= iv <= 2100
+    # type() identity (bool is excluded by it); for floats the range test
+    # runs first, so NaN/inf never reach int()
+    t = type(v)
+    if t is int:
+        return 1900 <= v <= 2100
+    if t is float:
+        return 1900.0 <= v <= 2100.0 and int(v) == v
     return False
 
-def _collect_yearish_columns(ws: Worksheet, scan_rows: int = 6) -> Set[int]:
+def _collect_yearish_columns(
+    ws: Worksheet,
+    scan_rows: int = 6,
+    bounds: Optional[Tuple[int, int]] = None,
+) -> Set[int]:
     """
     Look at the first few rows. If a cell in a column contains a year-ish
     string/value, mark the whole column 'yearish'.
+    bounds is the (last row, last column) from _used_bounds for regular
+    sheets, whose iter_rows() would otherwise create the cells it visits.
     """
     yearish_cols: Set[int] = set()
-    max_scan_row = min(ws.max_row or 0, scan_rows)
-    for r in range(1, max_scan_row + 1):
-        for row in ws.iter_rows(min_row=r, max_row=r, values_only=False):
-            for cell in row:
-                v = cell.value
-                if isinstance(v, str) and _cell_has_yearish_text(v):
-                    yearish_cols.add(cell.column)
-                elif _is_four_digit_year_num(v):
-                    # Numbers in header area often represent years
-                    yearish_cols.add(cell.column)
+    scan_max_col = None
+    if bounds is not None:
+        scan_rows = min(scan_rows, bounds[0])
+        scan_max_col = bounds[1]
+        if not scan_rows:
+            return yearish_cols
+    # Known width (None for read-only sheets after reset_dimensions) lets the
+    # scan stop once every column is already marked
+    max_col = scan_max_col or ws.max_column or 0
+    # One iter_rows() call for the whole band: read-only sheets re-open the
+    # sheet XML on every call
+    for row in ws.iter_rows(min_row=1, max_row=scan_rows, max_col=scan_max_col, values_only=True):
+        for col, v in enumerate(row, 1):
+            if v is None or col in yearish_cols:
+                continue
+            if isinstance(v, str) and _cell_has_yearish_text(v):
+                yearish_cols.add(col)
+            elif _is_four_digit_year_num(v):
+                # Numbers in header area often represent years
+                yearish_cols.add(col)
+        if max_col and len(yearish_cols) >= max_col:
+            break
     return yearish_cols
 
 def _row_looks_yearish(row) -> bool:
@@ -135,49 +255,383 @@ def _row_looks_yearish(row) -> bool:
     row_text = normalize_header(" ".join(map(str, texts)))
     return _cell_has_yearish_text(row_text)
 
-def _looks_like_year(cell, hdr_text: str, v, column_yearish: bool, row_yearish: bool) -> bool:
-    # 1) Real datetime
-    if isinstance(v, datetime):
-        return True
-
-    # 2) Integer in 1900–2100 with year-ish context
-    if _is_four_digit_year_num(v):
-        if column_yearish or row_yearish:
-            return True
-        fmt = (cell.number_format or "").lower()
-        header_yearish = any(tok in hdr_text for tok in YEARISH_HEADER_TOKENS)
-        fmt_yearish = any(x in fmt for x in ["yy", "yyyy", "mmm", "mm/", "dd", "-yy", "d-m", "m-d"])
-        if header_yearish or fmt_yearish:
-            return True
-
-    return False
+def _has_yearish_format(cell) -> bool:
+    fmt = (cell.number_format or "").lower()
+    return any(x in fmt for x in YEARISH_FORMAT_TOKENS)
 
 # ---------------- Main processing ----------------
 
+# Evaluated values only, and skip parsing parts the conversion never reads
+# (VBA, external link caches, rich-text runs)
+LOAD_OPTIONS = {"data_only": True, "keep_vba": False, "keep_links": False, "rich_text": False}
+
+# Results within half a cent of the stored value count as unchanged and are
+# not written back (nor counted as converted)
+NOOP_TOLERANCE = 0.005
+
+def _is_noop_change(new_v: float, v: float) -> bool:
+    return math.isclose(new_v, v, rel_tol=0.0, abs_tol=NOOP_TOLERANCE)
+
+# Per-column flags built by _column_flags and read by _row_amounts
+COL_DAYS = 1   # "No of days" column on a Depreciation sheet
+COL_YEAR = 2   # 1900-2100 integers here are years, not amounts
+
+def _row_amounts(
+    row,
+    col_flags: Dict[int, int],
+    pct_cache: Dict[int, bool],
+    ws_stats: dict,
+) -> Dict[int, float]:
+    """
+    Pick out the cells of one row that should be converted as amounts.
+    Returns {column: value}; works on both regular and read-only worksheets
+    (columns are taken from the position in the row).
+    pct_cache memoizes the percentage check per shared format (one dict per sheet).
+    """
+    amounts: Dict[int, float] = {}
+    row_yearish = _row_looks_yearish(row)  # NEW: row context
+    seen = 0
+    for col, cell in enumerate(row, 1):
+        # Only cells holding a value are counted: the in-place path sees the
+        # used rectangle, read-only rows are ragged and padded with EmptyCell,
+        # so counting visited cells would make the summary depend on the path.
+        # Non-master merged cells are None as well and drop out here.
+        v = cell.value
+        if v is None:
+            continue
+        seen += 1
+
+        # Only plain numbers can be amounts (or days); type() identity instead of
+        # isinstance(), and bool is its own type so True/False drop out here
+        t = type(v)
+        if t is not int and t is not float:
+            continue
+        # NaN/inf can't be scaled (math.floor raises on inf); leave them as stored
+        if t is float and not math.isfinite(v):
+            continue
+
+        flags = col_flags.get(col, 0)
+
+        # Depreciation "No of days" rounding (as in your original; left non-destructive)
+        if flags & COL_DAYS:
+            _ = round_half_up_int(float(v))
+            # If you want to actually write it back, uncomment:
+            # if _ != v:
+            #     cell.value = _
+            #     ws_stats["cells_converted"] += 1
+            continue
+
+        # Amount conversion for significant numerics; dates are never converted,
+        # so format/header checks only run for numbers large enough to be amounts
+        if abs(v) >= 100:
+            # Skip percentages. Cells share a few formats, so cache the verdict by
+            # the style index (read-only) or number-format id (regular cells);
+            # cell.style_id would hash the whole StyleArray and cost more
+            if type(cell) is ReadOnlyCell:
+                key = cell._style_id
+            else:
+                # _style is None for cells without any style: General format
+                key = cell._style.numFmtId if cell._style is not None else 0
+            is_pct = pct_cache.get(key)
+            if is_pct is None:
+                is_pct = pct_cache[key] = is_percentage_cell(cell)
+            if is_pct:
+                continue
+
+            # Skip 1900-2100 integers with year-ish context (column, row or format)
+            if _is_four_digit_year_num(v) and (
+                flags & COL_YEAR or row_yearish or _has_yearish_format(cell)
+            ):
+                continue
+
+            amounts[col] = float(v)
+    ws_stats["cells_seen"] += seen
+    return amounts
+
+def _column_flags(ws, header_row: int, bounds: Optional[Tuple[int, int]] = None) -> Dict[int, int]:
+    """
+    Per-column COL_* flags used by _row_amounts. COL_YEAR marks year-ish
+    values in the first rows or a year-ish header; COL_DAYS only applies on
+    Depreciation sheets. bounds as for _collect_yearish_columns.
+    """
+    title = (ws.title or "").strip()
+    is_depr = "depreciation" in title.lower()
+    if bounds is None:
+        hdrs = header_map(ws, header_row)
+    elif header_row <= bounds[0]:
+        hdrs = header_map(ws, header_row, max_col=bounds[1])
+    else:
+        hdrs = {}
+    col_flags: Dict[int, int] = {}
+
+    # NEW: detect columns that look like years in the first few rows
+    for c in _collect_yearish_columns(ws, scan_rows=6, bounds=bounds):
+        col_flags[c] = COL_YEAR
+    for c, h in hdrs.items():
+        if any(tok in h for tok in YEARISH_HEADER_TOKENS):
+            col_flags[c] = col_flags.get(c, 0) | COL_YEAR
+
+    if is_depr:
+        for c, h in hdrs.items():
+            if (h in DAYS_HEADER_VARIANTS) or ("day" in h and "holiday" not in h):
+                col_flags[c] = col_flags.get(c, 0) | COL_DAYS
+    return col_flags
+
+def _write_only_row(out_ws, r: int, row, changes: Dict[int, float]) -> None:
+    """
+    Append one row to a write-only sheet: converted values where present,
+    the original values otherwise, keeping each cell's style. r is implied
+    by the append order; it is there to match _xlsxwriter_row.
+    """
+    out_row = []
+    for col, cell in enumerate(row, 1):
+        if isinstance(cell, EmptyCell):
+            out_row.append(None)
+            continue
+        out_cell = WriteOnlyCell(out_ws, value=changes.get(col, cell.value))
+        if cell.data_type == "s" and col not in changes:
+            # Setting value re-guesses the type, turning text such as
+            # "=== Notes ===" into a formula or "#N/A" into an error
+            out_cell.data_type = "s"
+        if cell.has_style:
+            out_cell.number_format = cell.number_format
+            out_cell.font = cell.font
+            out_cell.fill = cell.fill
+            out_cell.border = cell.border
+            out_cell.alignment = cell.alignment
+            out_cell.protection = cell.protection
+        out_row.append(out_cell)
+    out_ws.append(out_row)
+
+# xlsxwriter border styles by openpyxl Side.style name
+_XLSX_BORDER_STYLES = {
+    "thin": 1, "medium": 2, "dashed": 3, "dotted": 4, "thick": 5, "double": 6,
+    "hair": 7, "mediumDashed": 8, "dashDot": 9, "mediumDashDot": 10,
+    "dashDotDot": 11, "mediumDashDotDot": 12, "slantDashDot": 13,
+}
+_XLSX_HALIGN = {"centerContinuous": "center_across"}
+_XLSX_VALIGN = {"center": "vcenter", "justify": "vjustify", "distributed": "vdistributed"}
+
+def _rgb_hex(color) -> Optional[str]:
+    # Only explicit ARGB colors translate; theme/indexed colors are left out
+    if color is not None and color.type == "rgb" and isinstance(color.rgb, str) and len(color.rgb) == 8:
+        return "#" + color.rgb[2:]
+    return None
+
+def _xlsxwriter_format(out_wb, cell):
+    """
+    Translate a read-only cell's style into an xlsxwriter Format: number
+    format, font, solid fill, alignment and borders. None if nothing applies.
+    """
+    props = {}
+    if cell.number_format and cell.number_format != "General":
+        props["num_format"] = cell.number_format
+
+    font = cell.font
+    if font is not None:
+        if font.b:
+            props["bold"] = True
+        if font.i:
+            props["italic"] = True
+        if font.u:
+            props["underline"] = 2 if font.u == "double" else 1
+        if font.name:
+            props["font_name"] = font.name
+        if font.sz:
+            props["font_size"] = font.sz
+        if _rgb_hex(font.color):
+            props["font_color"] = _rgb_hex(font.color)
+
+    fill = cell.fill
+    if getattr(fill, "fill_type", None) == "solid" and _rgb_hex(fill.fgColor):
+        props["bg_color"] = _rgb_hex(fill.fgColor)
+
+    al = cell.alignment
+    if al is not None:
+        if al.horizontal and al.horizontal != "general":
+            props["align"] = _XLSX_HALIGN.get(al.horizontal, al.horizontal)
+        if al.vertical:
+            props["valign"] = _XLSX_VALIGN.get(al.vertical, al.vertical)
+        if al.wrap_text:
+            props["text_wrap"] = True
+        if al.indent:
+            props["indent"] = int(al.indent)
+
+    border = cell.border
+    if border is not None:
+        for side_name in ("left", "right", "top", "bottom"):
+            side = getattr(border, side_name)
+            if side is not None and side.style:
+                props[side_name] = _XLSX_BORDER_STYLES.get(side.style, 1)
+                if _rgb_hex(side.color):
+                    props[side_name + "_color"] = _rgb_hex(side.color)
+
+    return out_wb.add_format(props) if props else None
+
+def _xlsxwriter_row(out_wb, out_ws, r: int, row, changes: Dict[int, float], formats: dict) -> None:
+    """
+    Write one row to an xlsxwriter sheet (0-based r): converted values where
+    present, the original values otherwise. formats caches the translated
+    Format per shared style index for the whole workbook.
+    """
+    for c, cell in enumerate(row):
+        if isinstance(cell, EmptyCell):
+            continue
+        v = changes.get(c + 1, cell.value)
+
+        key = cell._style_id
+        if key in formats:
+            fmt = formats[key]
+        else:
+            fmt = formats[key] = _xlsxwriter_format(out_wb, cell) if cell.has_style else None
+
+        t = type(v)
+        if v is None:
+            if fmt is not None:
+                out_ws.write_blank(r, c, None, fmt)
+        elif cell.data_type == "e":
+            # Cached errors (#N/A, #DIV/0!, #REF!, ...) have no plain-value
+            # writer in xlsxwriter; a formula yielding the error, with the error
+            # as its cached result, keeps the cell an error rather than text
+            out_ws.write_formula(r, c, "=NA()" if v == "#N/A" else "=" + v, fmt, v)
+        elif t is str:
+            # write_string, not write(): text starting with "=" must stay text
+            out_ws.write_string(r, c, v, fmt)
+        elif t is bool:
+            out_ws.write_boolean(r, c, v, fmt)
+        elif t is int or t is float:
+            out_ws.write_number(r, c, v, fmt)
+        elif isinstance(v, (datetime, date, time, timedelta)):
+            out_ws.write_datetime(r, c, v, fmt)
+        else:
+            out_ws.write(r, c, v, fmt)
+
+def _sheet_edits(
+    ws,
+    rows,
+    header_row: int,
+    mode: str,
+    lakh_edge_threshold: float,
+    bounds: Optional[Tuple[int, int]] = None,
+) -> Tuple[List[Tuple[int, int, float]], dict]:
+    """
+    Convert one sheet without touching it: returns ([(row, col, new_value)], ws_stats).
+    Amount cells are collected first and converted in one vectorized pass.
+    bounds (regular sheets only) keeps the header/year scans inside the used range.
+    """
+    col_flags = _column_flags(ws, header_row, bounds)
+    pct_cache: Dict[int, bool] = {}
+    ws_stats = {"cells_seen": 0, "cells_converted": 0}
+    pos_rows: List[int] = []
+    pos_cols: List[int] = []
+    old_vals: List[float] = []
+
+    for r, row in enumerate(rows, 1):
+        for col, v in _row_amounts(row, col_flags, pct_cache, ws_stats).items():
+            pos_rows.append(r)
+            pos_cols.append(col)
+            old_vals.append(v)
+
+    edits: List[Tuple[int, int, float]] = []
+    if old_vals:
+        old_arr = np.array(old_vals, dtype=np.float64)
+        new_arr = _divide_amounts(old_arr, mode, lakh_edge_threshold)
+        new_list = new_arr.tolist()
+        # Same tolerance as _is_noop_change: no cell is rewritten for a sub-cent change
+        for i in np.flatnonzero(np.abs(new_arr - old_arr) > NOOP_TOLERANCE).tolist():
+            edits.append((pos_rows[i], pos_cols[i], new_list[i]))
+    ws_stats["cells_converted"] += len(edits)
+    return edits, ws_stats
+
+def _workbook_source(input_file: Union[bytes, BinaryIO, str]):
+    """
+    Something load_workbook can open, possibly more than once: bytes are
+    wrapped (no copy of the data), paths pass through, streams are rewound.
+    """
+    if isinstance(input_file, (bytes, bytearray)):
+        return io.BytesIO(input_file)
+    if isinstance(input_file, (str, os.PathLike)):
+        return input_file
+    input_file.seek(0)
+    return input_file
+
+def _process_one_sheet(args) -> Tuple[str, List[Tuple[int, int, float]], dict]:
+    """
+    Worker for process_excel(workers > 1): open the workbook read-only, work
+    out the edits for one sheet and return (title, edits, ws_stats).
+    """
+    source, title, header_row, mode, lakh_edge_threshold = args
+    wb = load_workbook(_workbook_source(source), read_only=True, **LOAD_OPTIONS)
+    try:
+        ws = wb[title]
+        ws.reset_dimensions()
+        edits, ws_stats = _sheet_edits(ws, ws.iter_rows(), header_row, mode, lakh_edge_threshold)
+    finally:
+        wb.close()
+    return title, edits, ws_stats
+
 def process_excel(
-    input_bytes: bytes,
+    input_file: Union[bytes, BinaryIO, str],
     mode: str = "thousand",                  # thousand | lakh | 
     header_row: int = 1,
     lakh_edge_threshold: float = 50000,      # < threshold → thousand fallback in lakh/auto
     sheets_include: Optional[List[str]] = None,
     sheets_exclude: Optional[List[str]] = None,
-) -> Tuple[bytes, dict]:
+    low_memory: bool = False,
+    workers: int = 1,
+    writer: str = "openpyxl",                # openpyxl | xlsxwriter (streamed output)
+) -> Tuple[io.BytesIO, dict]:
     """
-    Process an Excel file given as bytes and return (output_bytes, summary_dict).
+    Process an Excel file and return (output_bio, summary_dict).
+    input_file may be bytes, a path, or a seekable binary file object (e.g.
+    Streamlit's UploadedFile), which is read in place rather than copied.
+    output_bio is an in-memory buffer positioned at the start; use
+    getvalue() if plain bytes are needed.
     Automatically rounds 'No of days' on Depreciation sheets (behavior unchanged).
-    """
-    import io
 
-    # Load workbook (evaluated values only)
-    bio = io.BytesIO(input_bytes)
-    wb = load_workbook(bio, data_only=True)
+    The workbook is loaded once, with evaluated values: formulas come back as
+    their last cached values and are saved as plain values. Formatting,
+    merged ranges and column widths are kept; charts and images only as far
+    as openpyxl round-trips them, and VBA and external links are dropped.
+
+    Amount cells are picked per cell, then converted per sheet in one NumPy
+    pass and only the changed cells are written back.
+
+    With workers > 1 the sheets are worked out in parallel processes (each
+    reading the file read-only) and the edits applied to the workbook here.
+
+    With low_memory=True the workbook is streamed (read-only in, write-only out),
+    so memory stays roughly per-row instead of per-workbook. Cell values and
+    styles are kept; nothing else at sheet level is. Chart sheets are dropped,
+    and so are merged ranges, column widths and row heights, freeze panes,
+    print settings, conditional formatting, data validation, hyperlinks,
+    comments, and charts and images on worksheets, as are defined names.
+    This path is sequential and ignores workers.
+
+    writer="xlsxwriter" streams the output through xlsxwriter in
+    constant_memory mode instead of a write-only openpyxl workbook, which
+    saves faster on large sheets. It implies low_memory, with the same
+    losses, and keeps the same values; styles are translated (number
+    format, font, solid fill, alignment, borders) rather than copied, so
+    theme colors and other less common style parts are lost. Cached error
+    values (#N/A, #DIV/0!, ...) are written as error formulas (=NA(),
+    =#DIV/0!) so they stay errors.
+    Needs the optional xlsxwriter package.
+    """
+    if writer not in ("openpyxl", "xlsxwriter"):
+        raise ValueError(f"writer must be 'openpyxl' or 'xlsxwriter', got {writer!r}")
+    use_xlsxwriter = writer == "xlsxwriter"
 
     # Filter sheets if requested
+    inc_l = tuple(pat.lower() for pat in sheets_include or ())
+    exc_l = tuple(pat.lower() for pat in sheets_exclude or ())
+
     def _sheet_allowed(name: str) -> bool:
+        name_l = name.lower()
         allowed = True
-        if sheets_include:
-            allowed = any(pat.lower() in name.lower() for pat in sheets_include)
-        if sheets_exclude and any(pat.lower() in name.lower() for pat in sheets_exclude):
+        if inc_l:
+            allowed = any(pat in name_l for pat in inc_l)
+        if exc_l and any(pat in name_l for pat in exc_l):
             allowed = False
         return allowed
 
@@ -189,81 +643,149 @@ def process_excel(
         "totals": {"cells_seen": 0, "cells_converted": 0},
     }
 
-    for ws in wb.worksheets:
-        if not _sheet_allowed(ws.title):
-            continue
-
-        title = (ws.title or "").strip()
-        title_l = title.lower()
-        is_depr = "depreciation" in title_l
-        hdrs = header_map(ws, header_row) if ws.max_row >= header_row else {}
-
-        # NEW: detect columns that look like years in the first few rows
-        yearish_cols = _collect_yearish_columns(ws, scan_rows=6)
-
-        days_cols: Set[int] = set()
-        if is_depr and hdrs:
-            for c, h in hdrs.items():
-                if (h in DAYS_HEADER_VARIANTS) or ("day" in h and "holiday" not in h):
-                    days_cols.add(c)
-
-        ws_stats = {"cells_seen": 0, "cells_converted": 0}
-
-        for row in ws.iter_rows():
-            row_yearish = _row_looks_yearish(row)  # NEW: row context
-            for cell in row:
-                # Skip non-master merged cells
-                if isinstance(cell, MergedCell):
-                    continue
-
-                v = cell.value
-                ws_stats["cells_seen"] += 1
-
-                # Depreciation "No of days" rounding (as in your original; left non-destructive)
-                if is_depr and days_cols and cell.column in days_cols and isinstance(v, (int, float)) and not isinstance(v, bool):
-                    _ = round_half_up_int(float(v))
-                    # If you want to actually write it back, uncomment:
-                    # if _ != v:
-                    #     cell.value = _
-                    #     ws_stats["cells_converted"] += 1
-                    continue
-
-                # Amount conversion for significant numerics
-                if isinstance(v, (int, float, datetime)) and not isinstance(v, bool):
-                    # Skip percentages
-                    if is_percentage_cell(cell):
-                        continue
-
-                    hdr_text = hdrs.get(cell.column, "")
-                    col_yearish = (cell.column in yearish_cols)
-
-                    # Skip if this looks like a year/date field
-                    if _looks_like_year(cell, hdr_text, v, col_yearish, row_yearish):
-                        continue
-
-                    # Only treat larger numbers as amounts
-                    if isinstance(v, (int, float)) and abs(float(v)) >= 100:
-                        new_v = _divide_amount(float(v), mode, lakh_edge_threshold)
-                        if new_v != v:
-                            cell.value = new_v
-                            ws_stats["cells_converted"] += 1
-
+    def _record(ws_title: str, ws_stats: dict) -> None:
+        title = (ws_title or "").strip()
         summary["sheets"][title] = ws_stats
         summary["totals"]["cells_seen"] += ws_stats["cells_seen"]
         summary["totals"]["cells_converted"] += ws_stats["cells_converted"]
 
-    # Save to bytes
     out_bio = io.BytesIO()
+
+    if low_memory or use_xlsxwriter:
+        wb = load_workbook(_workbook_source(input_file), read_only=True, **LOAD_OPTIONS)
+        if use_xlsxwriter:
+            import xlsxwriter  # optional, only needed for this writer
+
+            # Without in_memory, xlsxwriter keeps constant_memory and stages
+            # each sheet in a temp file before zipping into out_bio
+            out_wb = xlsxwriter.Workbook(out_bio, {"constant_memory": True, "nan_inf_to_errors": True})
+            formats: dict = {}
+        else:
+            out_wb = Workbook(write_only=True)
+
+        for ws in wb.worksheets:
+            if use_xlsxwriter:
+                out_ws = out_wb.add_worksheet(ws.title)
+                emit = partial(_xlsxwriter_row, out_wb, out_ws, formats=formats)
+            else:
+                out_ws = out_wb.create_sheet(ws.title)
+                emit = partial(_write_only_row, out_ws)
+            # The <dimension> tag is only used to pad rows, and some writers get
+            # it badly wrong (A1:A1, or ~1M rows for a small table); read the
+            # rows as stored instead
+            ws.reset_dimensions()
+
+            if not _sheet_allowed(ws.title):
+                for r, row in enumerate(ws.iter_rows()):
+                    emit(r, row, {})
+                continue
+
+            col_flags = _column_flags(ws, header_row)
+            pct_cache: Dict[int, bool] = {}
+            ws_stats = {"cells_seen": 0, "cells_converted": 0}
+            for r, row in enumerate(ws.iter_rows()):
+                changes = {}
+                for col, v in _row_amounts(row, col_flags, pct_cache, ws_stats).items():
+                    new_v = _divide_amount(v, mode, lakh_edge_threshold)
+                    if not _is_noop_change(new_v, v):
+                        changes[col] = new_v
+                        ws_stats["cells_converted"] += 1
+                emit(r, row, changes)
+            _record(ws.title, ws_stats)
+
+        if use_xlsxwriter:
+            out_wb.close()
+        else:
+            out_wb.save(out_bio)
+        wb.close()
+        out_bio.seek(0)
+        return out_bio, summary
+
+    if workers > 1:
+        # Sheet names only need the workbook index, which read-only mode loads almost at once.
+        # worksheets, not sheetnames: chartsheets have no cells to work out
+        names_wb = load_workbook(_workbook_source(input_file), read_only=True, **LOAD_OPTIONS)
+        titles = [ws.title for ws in names_wb.worksheets if _sheet_allowed(ws.title)]
+        names_wb.close()
+        # Workers need something picklable to reopen: bytes or a path. A stream
+        # has to be materialized once here
+        if isinstance(input_file, (bytes, bytearray, str, os.PathLike)):
+            source = input_file
+        elif isinstance(input_file, io.BytesIO):
+            source = input_file.getvalue()
+        else:
+            input_file.seek(0)
+            source = input_file.read()
+        with ProcessPoolExecutor(max_workers=min(workers, len(titles) or 1)) as executor:
+            futures = [
+                executor.submit(_process_one_sheet, (source, t, header_row, mode, lakh_edge_threshold))
+                for t in titles
+            ]
+            # Load the full workbook while the workers run
+            wb = load_workbook(_workbook_source(input_file), **LOAD_OPTIONS)
+            results = [f.result() for f in futures]
+        for title, edits, ws_stats in results:
+            ws = wb[title]
+            for r, c, new_v in edits:
+                ws.cell(row=r, column=c).value = new_v
+            _record(title, ws_stats)
+    else:
+        wb = load_workbook(_workbook_source(input_file), **LOAD_OPTIONS)
+        for ws in wb.worksheets:
+            if not _sheet_allowed(ws.title):
+                continue
+            last_row, last_col = _used_bounds(ws)
+            rows = ws.iter_rows(max_row=last_row, max_col=last_col) if last_row else iter(())
+            edits, ws_stats = _sheet_edits(
+                ws, rows, header_row, mode, lakh_edge_threshold, bounds=(last_row, last_col)
+            )
+            for r, c, new_v in edits:
+                ws.cell(row=r, column=c).value = new_v
+            _record(ws.title, ws_stats)
+
+    # Save to bytes
     wb.save(out_bio)
     out_bio.seek(0)
 
-    return out_bio.read(), summary
+    return out_bio, summary
 
 
 # -------- Helpers for saving outputs/logs on server/UI ----------
 
+def _copy_to_file(output: Union[bytes, BinaryIO], f) -> None:
+    """
+    Write the converted workbook into the open file f without extra copies:
+    bytes and BytesIO go straight from their buffer, real files through
+    os.sendfile where available, anything else via shutil.copyfileobj.
+    """
+    if isinstance(output, (bytes, bytearray)):
+        f.write(output)
+        return
+    if isinstance(output, io.BytesIO):
+        with output.getbuffer() as view:
+            f.write(view)
+        return
+
+    output.seek(0)
+    try:
+        in_fd = output.fileno()
+    except (AttributeError, io.UnsupportedOperation):
+        in_fd = None
+    if in_fd is None or not hasattr(os, "sendfile"):
+        shutil.copyfileobj(output, f)
+        return
+
+    f.flush()
+    size = os.fstat(in_fd).st_size
+    offset = 0
+    while offset < size:
+        sent = os.sendfile(f.fileno(), in_fd, offset, size - offset)
+        if sent == 0:
+            break
+        offset += sent
+
 def save_outputs(
-    output_bytes: bytes,
+    output_bytes: Union[bytes, BinaryIO],   # bytes or the BytesIO from process_excel
     summary: dict,
     original_filename: str,
     out_dir: str = "backup",
@@ -276,7 +798,7 @@ def save_outputs(
     json_path = os.path.join(out_dir, f"{base}__{tag}__{stamp}.json")
 
     with open(xlsx_path, "wb") as f:
-        f.write(output_bytes)
+        _copy_to_file(output_bytes, f)
     with open(json_path, "w", encoding="utf-8") as f:
         json.dump(summary, f, ensure_ascii=False, indent=2)
 
@@ -18,9 +18,9 @@ if uploaded:
     st.success(f"Loaded file: {uploaded.name}")
 
     # Process with minimal/default settings; logic lives in amount_rounder.process_excel
-    uploaded_bytes = uploaded.read()
-    out_bytes, summary = process_excel(
-        input_bytes=uploaded_bytes,
+    # (the upload is passed as-is, no extra bytes copy)
+    out_bio, summary = process_excel(
+        input_file=uploaded,
         mode=mode,                # "lakh" or "thousand"
         header_row=1,             # keep default behavior for any day rounding detection
         lakh_edge_threshold=50000 # unused for "thousand" and simple "lakh" division, safe default
@@ -29,14 +29,14 @@ if uploaded:
     # Download button
     st.download_button(
         label="⬇️ Download processed workbook",
-        data=out_bytes,
+        data=out_bio,
         file_name=f"processed__{uploaded.name}",
         mime="application/vnd.openxmlformats-officedocument.spreadsheetml.sheet",
     )
 
     # Save a copy + log to backup/
     out_path, log_path = save_outputs(
-        output_bytes=out_bytes,
+        output_bytes=out_bio,
         summary=summary,
         original_filename=uploaded.name,
         out_dir="backup",